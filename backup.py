@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+
+from database import DatabaseManager
+
+
+def _print_result(result):
+    print(
+        f"✓ {result['path']}: {result['bytes'] / 1e6:.1f} MB, {result['pages']} pages "
+        f"in {result['steps']} steps, {result['seconds']:.2f}s ({result['mb_per_s']:.1f} MB/s)"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Online backups and snapshots of the study planner database")
+    parser.add_argument("--db", default="study_planner.db", help="Database file (default: study_planner.db)")
+    parser.add_argument("--pages", type=int, default=256, help="Pages copied per step (default: 256)")
+    parser.add_argument("--pause", type=float, default=0.005,
+                        help="Seconds to yield to other sessions between steps (default: 0.005)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backup_cmd = commands.add_parser("backup", help="Copy the database to a file")
+    backup_cmd.add_argument("dest", help="Destination file")
+
+    snapshot_cmd = commands.add_parser("snapshot", help="Take a timestamped snapshot")
+    snapshot_cmd.add_argument("--dir", default="backups", help="Snapshot directory (default: backups)")
+    snapshot_cmd.add_argument("--keep", type=int, default=None, help="Keep only the newest N snapshots")
+
+    list_cmd = commands.add_parser("list", help="List snapshots, oldest first")
+    list_cmd.add_argument("--dir", default="backups", help="Snapshot directory (default: backups)")
+
+    restore_cmd = commands.add_parser("restore", help="Restore the database from a snapshot")
+    restore_cmd.add_argument("snapshot", help="Snapshot file to restore")
+
+    args = parser.parse_args(argv)
+
+    if args.command != "restore" and not os.path.isfile(args.db):
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+
+    db = DatabaseManager(args.db)
+
+    if args.command == "backup":
+        _print_result(db.backup(args.dest, pages=args.pages, pause=args.pause))
+    elif args.command == "snapshot":
+        _print_result(db.snapshot(args.dir, keep=args.keep, pages=args.pages, pause=args.pause))
+    elif args.command == "list":
+        for path in db.list_snapshots(args.dir):
+            print(f"{path}  {os.path.getsize(path) / 1e6:.1f} MB")
+    elif args.command == "restore":
+        if not os.path.isfile(args.snapshot):
+            print(f"Snapshot not found: {args.snapshot}", file=sys.stderr)
+            return 1
+        db.restore(args.snapshot)
+        print(f"✓ Restored {args.db} from {args.snapshot}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+# Time series longer than this are downsampled before plotting
+MAX_SERIES_POINTS = 500
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: indices of the points to keep
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    keep = np.zeros(threshold, dtype=np.int64)
+    keep[-1] = n - 1
+    a = 0
+
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        next_start = int(np.floor((i + 1) * every)) + 1
+        next_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        start = int(np.floor(i * every)) + 1
+        end = int(np.floor((i + 1) * every)) + 1
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+
+    return keep
+
+
+def downsample_series(df, x_col, y_col, max_points=MAX_SERIES_POINTS):
+    # Shrink a time series to at most max_points rows, keeping its shape
+    if len(df) <= max_points:
+        return df
+    x = pd.to_datetime(df[x_col], errors="coerce")
+    if x.isna().any():
+        # Unparseable dates, fall back to row position
+        x = np.arange(len(df))
+    else:
+        x = x.astype("int64").to_numpy()
+    keep = lttb(x, df[y_col].to_numpy(), max_points)
+    return df.iloc[keep]
+
+
+def hours_by_subject_figure(hours_by_subject):
+    fig = px.bar(
+        hours_by_subject, 
+        x="name", 
+        y="hours", 
+        title="Total Study Hours per Subject",
+        labels={"name": "Subject", "hours": "Hours"}, 
+        color="hours", 
+        color_continuous_scale="Greys"
+    )
+    fig.update_layout(plot_bgcolor="white", paper_bgcolor="white", font=dict(color="#2c3e50"))
+    return fig
+
+
+def task_completion_figure(task_stats):
+    completion_data = pd.DataFrame({
+        "Status": ["Completed", "Pending"], 
+        "Count": [task_stats["completed"], task_stats["pending"]]
+    })
+
+    fig = px.pie(
+        completion_data, 
+        values="Count", 
+        names="Status", 
+        title="Task Distribution",
+        color_discrete_sequence=["#7f8c8d", "#bdc3c7"]
+    )
+    fig.update_layout(paper_bgcolor="white", font=dict(color="#2c3e50"))
+    return fig
+
+
+def daily_hours_figure(daily_hours, max_points=MAX_SERIES_POINTS):
+    daily_hours = downsample_series(daily_hours, "date", "hours", max_points)
+    fig = px.line(
+        daily_hours,
+        x="date",
+        y="hours",
+        title="Study Hours per Day",
+        labels={"date": "Date", "hours": "Hours"},
+        markers=len(daily_hours) <= 60
+    )
+    fig.update_traces(line_color="#2c3e50")
+    fig.update_layout(plot_bgcolor="white", paper_bgcolor="white", font=dict(color="#2c3e50"))
+    return fig
+
+
+def build_analytics_figures(analytics):
+    # Serialized figures for the Analytics page, None where there is no data
+    hours_by_subject = analytics.get_hours_by_subject()
+    daily_hours = analytics.get_daily_hours()
+    task_stats = analytics.get_task_stats()
+
+    figures = {'hours_by_subject': None, 'daily_hours': None}
+    if not hours_by_subject.empty and hours_by_subject['hours'].sum() > 0:
+        figures['hours_by_subject'] = hours_by_subject_figure(hours_by_subject).to_json()
+    if not daily_hours.empty:
+        figures['daily_hours'] = daily_hours_figure(daily_hours).to_json()
+    figures['task_completion'] = task_completion_figure(task_stats).to_json()
+    return figures
@@ -0,0 +1,165 @@
+import os
+import threading
+import warnings
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Columns mirrored for analytics. Free-text fields (notes, descriptions) stay in SQLite.
+MIRROR_TABLES = {
+    'subjects': """
+        id BIGINT PRIMARY KEY,
+        name VARCHAR,
+        difficulty INTEGER,
+        hours DOUBLE,
+        priority INTEGER
+    """,
+    'tasks': """
+        id BIGINT PRIMARY KEY,
+        subject_id BIGINT,
+        due_date VARCHAR,
+        estimated_hours DOUBLE,
+        completed INTEGER,
+        completed_at VARCHAR
+    """,
+    'study_logs': """
+        id BIGINT PRIMARY KEY,
+        subject_id BIGINT,
+        date VARCHAR,
+        hours_studied DOUBLE
+    """
+}
+MIRROR_COLUMNS = {
+    'subjects': "id, name, difficulty, hours, priority",
+    'tasks': "id, subject_id, due_date, estimated_hours, completed, completed_at",
+    'study_logs': "id, subject_id, date, hours_studied"
+}
+
+
+_shared_mirrors = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_mirror(db_manager):
+    # One mirror per database file per process: DuckDB allows a single
+    # read-write connection to a file, so sessions must not open their own
+    key = os.path.abspath(db_manager.db_name)
+    with _shared_lock:
+        if key not in _shared_mirrors:
+            _shared_mirrors[key] = ColumnarMirror(db_manager)
+        return _shared_mirrors[key]
+
+
+class ColumnarMirror:
+    # DuckDB copy of subjects, tasks and study_logs for fast group-bys.
+    # Synced lazily before each query: subjects and tasks are small and mutable,
+    # so they are replaced whole when they change; study_logs is append-only and
+    # copied by id unless a row was edited or deleted.
+    def __init__(self, db_manager, path=None):
+        self.db = db_manager
+        self.path = path or f"{db_manager.db_name}.duckdb"
+        self.lock = threading.RLock()
+        self.conn = None
+        self.synced_version = None
+
+        if duckdb is None:
+            warnings.warn("duckdb is not installed, analytics will keep using SQLite")
+
+    @property
+    def enabled(self):
+        return duckdb is not None
+
+    def connect(self):
+        with self.lock:
+            if self.conn is None:
+                self.conn = duckdb.connect(self.path)
+                for table, schema in MIRROR_TABLES.items():
+                    self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({schema})")
+                self.conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key VARCHAR PRIMARY KEY, value BIGINT)")
+            return self.conn
+
+    def _read_sqlite(self, query, params=()):
+        conn = self.db.get_connection()
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+
+    def _replace(self, mirror, table, df):
+        mirror.register("incoming", df)
+        mirror.execute(f"DELETE FROM {table}")
+        mirror.execute(f"INSERT INTO {table} SELECT {MIRROR_COLUMNS[table]} FROM incoming")
+        mirror.unregister("incoming")
+
+    def sync(self):
+        # Bring the mirror up to the current SQLite counters. Only tables whose
+        # trigger-maintained counter moved are copied, so unchanged data is never
+        # rescanned. The counters are read before any rows, so a write landing
+        # mid-sync leaves the mirror marked behind and is picked up next time.
+        meta = self.db.get_meta()
+        version = meta.get('data_version', 0)
+        if version == self.synced_version:
+            return
+
+        with self.lock:
+            if version == self.synced_version:
+                return
+            mirror = self.connect()
+            state = dict(mirror.execute("SELECT key, value FROM sync_state").fetchall())
+            if state.get('data_version') == version:
+                self.synced_version = version
+                return
+
+            # A restored snapshot starts a new epoch: copy everything again
+            reset = state.get('epoch') != meta.get('epoch')
+
+            def changed(key):
+                return reset or state.get(key) != meta.get(key, 0)
+
+            mirror.execute("BEGIN TRANSACTION")
+            try:
+                for table in ("subjects", "tasks"):
+                    if changed(f"{table}_version"):
+                        self._replace(mirror, table, self._read_sqlite(f"SELECT {MIRROR_COLUMNS[table]} FROM {table}"))
+
+                if changed('study_logs_rewrites'):
+                    # Rows edited or deleted in SQLite: copy the table again
+                    self._replace(
+                        mirror, "study_logs",
+                        self._read_sqlite(f"SELECT {MIRROR_COLUMNS['study_logs']} FROM study_logs")
+                    )
+                elif changed('study_logs_version'):
+                    last_id = mirror.execute("SELECT COALESCE(MAX(id), 0) FROM study_logs").fetchone()[0]
+                    new_logs = self._read_sqlite(
+                        f"SELECT {MIRROR_COLUMNS['study_logs']} FROM study_logs WHERE id > ? ORDER BY id",
+                        (int(last_id),)
+                    )
+                    if not new_logs.empty:
+                        mirror.register("incoming", new_logs)
+                        mirror.execute(f"INSERT INTO study_logs SELECT {MIRROR_COLUMNS['study_logs']} FROM incoming")
+                        mirror.unregister("incoming")
+
+                for key, value in meta.items():
+                    mirror.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (key, value))
+                mirror.execute("COMMIT")
+            except Exception:
+                mirror.execute("ROLLBACK")
+                raise
+            self.synced_version = version
+
+    def query(self, query, params=()):
+        # Run an analytics query against the mirror, returns a DataFrame,
+        # or None when the mirror can't be used (e.g. locked by another process)
+        try:
+            self.sync()
+            cursor = self.connect().cursor()
+            try:
+                return cursor.execute(query, list(params)).df()
+            finally:
+                cursor.close()
+        except duckdb.Error as e:
+            warnings.warn(f"Columnar mirror unavailable, using SQLite: {e}")
+            return None
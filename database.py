@@ -1,20 +1,69 @@
+import os
+import pathlib
+import random
 import sqlite3
-from datetime import date
+import time
+from datetime import date, datetime, timedelta
 import pandas as pd
+from columnar import get_shared_mirror
+from retrieval import get_shared_index
+
+# Bumped whenever a migration is added to DatabaseManager.migrate
+SCHEMA_VERSION = 3
+# Write counters kept in db_meta by triggers, see create_version_triggers
+META_COUNTERS = (
+    "data_version", "subjects_version", "tasks_version", "study_logs_version", "study_logs_rewrites"
+)
+
+
+def to_iso_date(value):
+    # Canonical YYYY-MM-DD text for DATE columns, so they sort and range-scan correctly
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return date.fromisoformat(str(value)[:10]).isoformat()
 
 class DatabaseManager:
-    def __init__(self, db_name="study_planner.db"):
+    def __init__(self, db_name="study_planner.db", read_only=False):
         self.db_name = db_name
-        self.init_database()
+        self.read_only = read_only
+        if read_only:
+            # Never create tables or migrate; the file must already be current
+            self.check_schema()
+        else:
+            self.init_database()
 
     def get_connection(self):
+        if self.read_only:
+            uri = pathlib.Path(os.path.abspath(self.db_name)).as_uri() + "?mode=ro"
+            return sqlite3.connect(uri, uri=True)
         return sqlite3.connect(self.db_name)
 
+    def check_schema(self):
+        # Raise if the file is missing or older than SCHEMA_VERSION
+        conn = self.get_connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+        if version < SCHEMA_VERSION:
+            raise sqlite3.DatabaseError(
+                f"{self.db_name} is at schema version {version}, expected {SCHEMA_VERSION}; "
+                "open it read-write once to migrate it"
+            )
+
     def init_database(self):
         # Create all tables
         conn = self.get_connection()
         cursor = conn.cursor()
 
+        # Lets RetentionManager hand freed pages back in small chunks.
+        # Only takes effect on new files, before the first table exists.
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # Readers (including backups) never block writers in WAL mode
+        cursor.execute("PRAGMA journal_mode = WAL")
+
         # Subjects table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS subjects (
@@ -65,9 +114,228 @@ class DatabaseManager:
             )
         """)
 
+        # Archive tables, filled by RetentionManager
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS chat_history_archive (
+                id INTEGER PRIMARY KEY,
+                message TEXT NOT NULL,
+                response TEXT NOT NULL,
+                timestamp TIMESTAMP,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tasks_archive (
+                id INTEGER PRIMARY KEY,
+                subject_id INTEGER,
+                title TEXT NOT NULL,
+                description TEXT,
+                due_date DATE,
+                estimated_hours REAL,
+                completed BOOLEAN DEFAULT 1,
+                created_at TIMESTAMP,
+                completed_at TIMESTAMP,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Data version, bumped by triggers on every write that affects analytics
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS db_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        for key in META_COUNTERS:
+            cursor.execute("INSERT OR IGNORE INTO db_meta (key, value) VALUES (?, 0)", (key,))
+        # Identifies this copy of the data; replaced on restore so caches
+        # keyed on it can't mistake restored rows for ones they already hold
+        cursor.execute("INSERT OR IGNORE INTO db_meta (key, value) VALUES ('epoch', ?)", (random.getrandbits(62),))
+        self.create_version_triggers(cursor)
+
         conn.commit()
+        self.migrate(conn)
         conn.close()
 
+    def create_version_triggers(self, cursor):
+        # Every write bumps data_version and its table's counter; updates and
+        # deletes on study_logs also bump study_logs_rewrites, because those
+        # can't be picked up by copying new ids
+        for table in ("subjects", "tasks", "study_logs"):
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                keys = ["data_version", f"{table}_version"]
+                if table == "study_logs" and event != "INSERT":
+                    keys.append("study_logs_rewrites")
+                key_list = ", ".join(f"'{key}'" for key in keys)
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE db_meta SET value = value + 1 WHERE key IN ({key_list});
+                    END
+                """)
+
+    def get_meta(self):
+        # All db_meta counters as a dict
+        conn = self.get_connection()
+        rows = conn.execute("SELECT key, value FROM db_meta").fetchall()
+        conn.close()
+        return dict(rows)
+
+    def get_data_version(self):
+        # Changes whenever subjects, tasks or study logs are written
+        return self.get_meta().get('data_version', 0)
+
+    def backup(self, dest_path, pages=256, pause=0.005):
+        # Online copy through SQLite's backup API, `pages` pages per step.
+        # Sleeping between steps lets other sessions read and write meanwhile.
+        stats = {'steps': 0, 'pages': 0}
+
+        def on_progress(status, remaining, total):
+            stats['steps'] += 1
+            stats['pages'] = total
+            time.sleep(pause)
+
+        # Copy to a temp file so dest_path is never a half-written database
+        tmp_path = f"{dest_path}.partial"
+        started = time.perf_counter()
+        src = self.get_connection()
+        dst = sqlite3.connect(tmp_path)
+        try:
+            if src.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+                # Pin one read snapshot for the whole copy. Other sessions keep
+                # committing to the WAL, and the backup no longer restarts on
+                # every write made through another connection.
+                src.execute("BEGIN")
+                src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            src.backup(dst, pages=pages, progress=on_progress)
+            # The copy inherits WAL mode from the source; a standalone file
+            # shouldn't grow -wal/-shm files next to it whenever it is opened
+            dst.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dst.close()
+            src.close()
+        os.replace(tmp_path, dest_path)
+
+        seconds = time.perf_counter() - started
+        size = os.path.getsize(dest_path)
+        return {
+            'path': dest_path,
+            'pages': stats['pages'],
+            'steps': stats['steps'],
+            'bytes': size,
+            'seconds': seconds,
+            'mb_per_s': size / 1e6 / seconds if seconds else 0.0
+        }
+
+    def snapshot(self, directory="backups", keep=None, **backup_options):
+        # Timestamped point-in-time copy, keeping only the newest `keep`
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(self.db_name))[0]
+        # Microseconds keep snapshots taken within the same second apart;
+        # backup() replaces its destination, so never reuse a name
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(directory, f"{stem}-{stamp}.db")
+        if os.path.exists(path):
+            raise FileExistsError(f"Snapshot already exists: {path}")
+        result = self.backup(path, **backup_options)
+
+        if keep:
+            for old in self.list_snapshots(directory)[:-keep]:
+                # Snapshots taken before the switch to DELETE mode may have sidecars
+                for path in (old, old + "-wal", old + "-shm"):
+                    if os.path.exists(path):
+                        os.remove(path)
+        return result
+
+    def list_snapshots(self, directory="backups"):
+        # Snapshot paths for this database, oldest first
+        if not os.path.isdir(directory):
+            return []
+        prefix = os.path.splitext(os.path.basename(self.db_name))[0] + "-"
+        return sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.startswith(prefix) and name.endswith(".db")
+        )
+
+    def restore(self, snapshot_path, pages=-1, pause=0.0):
+        # Copy a snapshot back over the live database
+        live_version = self.get_data_version()
+        # Escaped like get_connection: a raw "#" or "?" would cut the path
+        # short and drop mode=ro, opening (and creating) some other file
+        uri = pathlib.Path(os.path.abspath(snapshot_path)).as_uri() + "?mode=ro"
+        src = sqlite3.connect(uri, uri=True)
+        try:
+            check = src.execute("PRAGMA quick_check").fetchone()[0]
+            if check != "ok":
+                raise sqlite3.DatabaseError(f"Snapshot failed integrity check: {check}")
+            # An empty or unrelated database passes quick_check too
+            tables = {row[0] for row in src.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            missing = {"db_meta", "subjects", "tasks", "study_logs"} - tables
+            if missing:
+                raise sqlite3.DatabaseError(
+                    f"{snapshot_path} is not a study planner snapshot (missing {', '.join(sorted(missing))})"
+                )
+
+            dst = self.get_connection()
+            try:
+                src.backup(dst, pages=pages, progress=lambda *_: time.sleep(pause))
+            finally:
+                dst.close()
+        finally:
+            src.close()
+
+        self.init_database()
+
+        # The snapshot's counters are older than the ones caches have already
+        # seen, so move data_version past both and start a new epoch. The
+        # retrieval index and columnar mirror rebuild when the epoch changes.
+        conn = self.get_connection()
+        restored_version = conn.execute("SELECT value FROM db_meta WHERE key = 'data_version'").fetchone()[0]
+        conn.execute(
+            "UPDATE db_meta SET value = ? WHERE key = 'data_version'",
+            (max(live_version, restored_version) + 1,)
+        )
+        conn.execute("UPDATE db_meta SET value = ? WHERE key = 'epoch'", (random.getrandbits(62),))
+        conn.commit()
+        conn.close()
+
+    def migrate(self, conn):
+        # Bring older database files up to SCHEMA_VERSION
+        cursor = conn.cursor()
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+
+        if version < 1:
+            # Completion time, used to decide when a task can be archived
+            columns = [row[1] for row in cursor.execute("PRAGMA table_info(tasks)")]
+            if "completed_at" not in columns:
+                cursor.execute("ALTER TABLE tasks ADD COLUMN completed_at TIMESTAMP")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_timestamp ON chat_history(timestamp)")
+
+        if version < 2:
+            # Rewrite dates stored in other text formats (e.g. with a time part)
+            for table, column in (("tasks", "due_date"), ("tasks_archive", "due_date"), ("study_logs", "date")):
+                cursor.execute(f"""
+                    UPDATE {table} SET {column} = date({column})
+                    WHERE typeof({column}) = 'text'
+                      AND date({column}) IS NOT NULL
+                      AND {column} != date({column})
+                """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_completed_due_date ON tasks(completed, due_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_study_logs_date ON study_logs(date)")
+
+        if version < 3:
+            # Recreate the version triggers with per-table counters
+            for table in ("subjects", "tasks", "study_logs"):
+                for event in ("insert", "update", "delete"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{event}_version")
+            self.create_version_triggers(cursor)
+
+        if version < SCHEMA_VERSION:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+
 
 class SubjectCRUD:
     def __init__(self, db_manager):
@@ -120,7 +388,7 @@ class TaskCRUD:
         cursor.execute(
             """INSERT INTO tasks (subject_id, title, description, due_date, estimated_hours) 
                VALUES (?, ?, ?, ?, ?)""",
-            (subject_id, title, description, due_date, estimated_hours)
+            (subject_id, title, description, to_iso_date(due_date), estimated_hours)
         )
         task_id = cursor.lastrowid
         conn.commit()
@@ -154,14 +422,70 @@ class TaskCRUD:
         conn.close()
         return df
 
+    def get_due_between(self, start, end, completed=False):
+        # Get tasks due in [start, end], inclusive
+        conn = self.db.get_connection()
+        query = """
+            SELECT t.*, s.name as subject_name 
+            FROM tasks t 
+            LEFT JOIN subjects s ON t.subject_id = s.id
+            WHERE t.completed = ? AND t.due_date >= ? AND t.due_date <= ?
+            ORDER BY t.due_date ASC
+        """
+        df = pd.read_sql_query(
+            query, conn, params=(int(completed), to_iso_date(start), to_iso_date(end))
+        )
+        conn.close()
+        return df
+
+    def get_overdue(self, as_of=None):
+        # Get pending tasks whose due date has passed
+        as_of = to_iso_date(as_of or date.today())
+        conn = self.db.get_connection()
+        query = """
+            SELECT t.*, s.name as subject_name 
+            FROM tasks t 
+            LEFT JOIN subjects s ON t.subject_id = s.id
+            WHERE t.completed = 0 AND t.due_date < ?
+            ORDER BY t.due_date ASC
+        """
+        df = pd.read_sql_query(query, conn, params=(as_of,))
+        conn.close()
+        return df
+
+    def get_agenda(self, days=7, as_of=None):
+        # Overdue tasks plus pending tasks due in the `days` days starting today
+        # (today through today + days - 1, same window as the chat router)
+        as_of = date.fromisoformat(to_iso_date(as_of or date.today()))
+        return {
+            'overdue': self.get_overdue(as_of),
+            'upcoming': self.get_due_between(as_of, as_of + timedelta(days=days - 1))
+        }
+
     def mark_complete(self, task_id):
         # Mark task as done
         conn = self.db.get_connection()
         cursor = conn.cursor()
-        cursor.execute("UPDATE tasks SET completed = 1 WHERE id = ?", (task_id,))
+        cursor.execute(
+            "UPDATE tasks SET completed = 1, completed_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (task_id,)
+        )
         conn.commit()
         conn.close()
 
+    def read_archived(self):
+        # Get archived tasks with subject names
+        conn = self.db.get_connection()
+        query = """
+            SELECT t.*, s.name as subject_name 
+            FROM tasks_archive t 
+            LEFT JOIN subjects s ON t.subject_id = s.id
+            ORDER BY t.completed_at DESC
+        """
+        df = pd.read_sql_query(query, conn)
+        conn.close()
+        return df
+
 
 class StudyLogCRUD:
     def __init__(self, db_manager):
@@ -174,7 +498,7 @@ class StudyLogCRUD:
         cursor.execute(
             """INSERT INTO study_logs (subject_id, date, hours_studied, notes) 
                VALUES (?, ?, ?, ?)""",
-            (subject_id, date, hours_studied, notes)
+            (subject_id, to_iso_date(date), hours_studied, notes)
         )
         log_id = cursor.lastrowid
         conn.commit()
@@ -222,63 +546,217 @@ class ChatHistoryCRUD:
         conn.close()
         return df
 
+    def read_archive(self, limit=None):
+        # Get archived chat history
+        conn = self.db.get_connection()
+        query = "SELECT * FROM chat_history_archive ORDER BY timestamp DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        df = pd.read_sql_query(query, conn)
+        conn.close()
+        return df
 
-class AnalyticsDB:
-    def __init__(self, db_manager):
+
+class RetentionManager:
+    # Moves old rows out of the hot tables and shrinks the file in small steps.
+    # Every batch is its own short transaction so interactive writers only
+    # ever wait for one batch, never for the whole run.
+    def __init__(self, db_manager, chat_days=90, task_days=30,
+                 batch_size=500, vacuum_pages=256, pause=0.01):
         self.db = db_manager
+        self.chat_days = chat_days
+        self.task_days = task_days
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self.pause = pause
+
+    def archive_chat_history(self):
+        # Move chat exchanges older than chat_days to the archive
+        return self._move_in_batches(
+            "chat_history",
+            "chat_history_archive",
+            "id, message, response, timestamp",
+            "timestamp < datetime('now', ?)",
+            (f"-{int(self.chat_days)} days",)
+        )
 
-    def get_total_study_hours(self):
-        # Sum of all study hours
+    def archive_completed_tasks(self):
+        # Move tasks completed more than task_days ago to the archive
+        return self._move_in_batches(
+            "tasks",
+            "tasks_archive",
+            "id, subject_id, title, description, due_date, estimated_hours, "
+            "completed, created_at, completed_at",
+            "completed = 1 AND COALESCE(completed_at, created_at) < datetime('now', ?)",
+            (f"-{int(self.task_days)} days",)
+        )
+
+    def _move_in_batches(self, source, archive, columns, where, params):
+        moved = 0
+        while True:
+            conn = self.db.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT id FROM {source} WHERE {where} ORDER BY id LIMIT ?",
+                params + (self.batch_size,)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                conn.close()
+                break
+
+            placeholders = ",".join("?" * len(ids))
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {archive} ({columns}) "
+                f"SELECT {columns} FROM {source} WHERE id IN ({placeholders})",
+                ids
+            )
+            cursor.execute(f"DELETE FROM {source} WHERE id IN ({placeholders})", ids)
+            conn.commit()
+            conn.close()
+
+            moved += len(ids)
+            time.sleep(self.pause)
+        return moved
+
+    def is_incremental(self):
+        # Whether the file is in auto_vacuum=INCREMENTAL mode. Files created
+        # before this mode existed need enable_incremental_vacuum once.
         conn = self.db.get_connection()
-        query = "SELECT COALESCE(SUM(hours_studied), 0) as total FROM study_logs"
-        result = pd.read_sql_query(query, conn)
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
         conn.close()
-        return float(result['total'][0])
+        return mode == 2
+
+    def incremental_vacuum(self, max_steps=None):
+        # Release free pages back to the OS, vacuum_pages at a time
+        if not self.is_incremental():
+            return 0
 
-    def get_task_stats(self):
-        # Count completed and pending tasks
         conn = self.db.get_connection()
-        completed = pd.read_sql_query(
-            "SELECT COUNT(*) as count FROM tasks WHERE completed = 1", conn
-        )['count'][0]
-        pending = pd.read_sql_query(
-            "SELECT COUNT(*) as count FROM tasks WHERE completed = 0", conn
-        )['count'][0]
+        cursor = conn.cursor()
+
+        freed = 0
+        steps = 0
+        free_pages = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        while free_pages and (max_steps is None or steps < max_steps):
+            # execute() steps the pragma once, freeing a single page;
+            # executescript runs it to completion in its own transaction
+            conn.executescript(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)});")
+            remaining = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free_pages:
+                break
+            freed += free_pages - remaining
+            free_pages = remaining
+            steps += 1
+            time.sleep(self.pause)
         conn.close()
-        return {'completed': completed, 'pending': pending}
+        return freed
 
-    def get_hours_by_subject(self):
-        # Study hours grouped by subject
+    def enable_incremental_vacuum(self):
+        # One-off full VACUUM to switch an existing file to incremental mode.
+        # This rewrites the whole file, so run it outside busy hours.
         conn = self.db.get_connection()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.close()
+
+    def run(self, max_vacuum_steps=None):
+        # Apply the full retention policy
+        return {
+            'chat_archived': self.archive_chat_history(),
+            'tasks_archived': self.archive_completed_tasks(),
+            'pages_freed': self.incremental_vacuum(max_vacuum_steps),
+            'incremental': self.is_incremental()
+        }
+
+
+class AnalyticsDB:
+    def __init__(self, db_manager, columnar=None):
+        self.db = db_manager
+        # Optional ColumnarMirror, queried instead of SQLite when enabled
+        self.columnar = columnar
+
+    def _read(self, query, params=()):
+        # Run an aggregation on the columnar mirror if enabled, else on SQLite
+        if self.columnar is not None and self.columnar.enabled:
+            df = self.columnar.query(query, params)
+            if df is not None:
+                return df
+        return self._read_sqlite(query, params)
+
+    def _read_sqlite(self, query, params=()):
+        conn = self.db.get_connection()
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+
+    def get_total_study_hours(self):
+        # Sum of all study hours
+        query = "SELECT COALESCE(SUM(hours_studied), 0) as total FROM study_logs"
+        result = self._read(query)
+        return float(result['total'][0])
+
+    def get_task_stats(self):
+        # Count completed and pending tasks. Archived tasks were all completed,
+        # so they still count; the archive isn't mirrored, so this stays on SQLite.
         query = """
+            SELECT (SELECT COUNT(*) FROM tasks WHERE completed = 1)
+                   + (SELECT COUNT(*) FROM tasks_archive) as completed,
+                   (SELECT COUNT(*) FROM tasks WHERE completed = 0) as pending
+        """
+        result = self._read_sqlite(query)
+        return {'completed': int(result['completed'][0]), 'pending': int(result['pending'][0])}
+
+    def get_hours_by_subject(self, start=None, end=None):
+        # Study hours grouped by subject, optionally within [start, end]
+        conditions = ""
+        params = []
+        if start:
+            conditions += " AND sl.date >= ?"
+            params.append(to_iso_date(start))
+        if end:
+            conditions += " AND sl.date <= ?"
+            params.append(to_iso_date(end))
+        query = f"""
             SELECT s.name, COALESCE(SUM(sl.hours_studied), 0) as hours
             FROM subjects s
-            LEFT JOIN study_logs sl ON s.id = sl.subject_id
+            LEFT JOIN study_logs sl ON s.id = sl.subject_id{conditions}
             GROUP BY s.id, s.name
             ORDER BY hours DESC
         """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
+        return self._read(query, params)
+
+    def get_daily_hours(self):
+        # Study hours per day, oldest first
+        query = """
+            SELECT date, SUM(hours_studied) as hours
+            FROM study_logs
+            WHERE date IS NOT NULL
+            GROUP BY date
+            ORDER BY date ASC
+        """
+        return self._read(query)
 
     def get_average_difficulty(self):
         # Average difficulty of all subjects
-        conn = self.db.get_connection()
         query = "SELECT COALESCE(AVG(difficulty), 0) as avg FROM subjects"
-        result = pd.read_sql_query(query, conn)
-        conn.close()
+        result = self._read(query)
         return float(result['avg'][0])
 
 
 # Initialize all database managers
-def get_db_managers(db_name="study_planner.db"):
-    # Create and return all database managers
-    db = DatabaseManager(db_name)
+def get_db_managers(db_name="study_planner.db", columnar=False, read_only=False):
+    # Create and return all database managers.
+    # columnar=True routes analytics through a DuckDB mirror (needs duckdb).
+    # read_only=True opens an existing, migrated file without writing to it.
+    db = DatabaseManager(db_name, read_only=read_only)
     return {
         'db': db,
         'subjects': SubjectCRUD(db),
         'tasks': TaskCRUD(db),
         'logs': StudyLogCRUD(db),
         'chat': ChatHistoryCRUD(db),
-        'analytics': AnalyticsDB(db)
+        'analytics': AnalyticsDB(db, get_shared_mirror(db) if columnar else None),
+        'retention': RetentionManager(db),
+        'retrieval': get_shared_index(db)
     }
\ No newline at end of file
@@ -0,0 +1,204 @@
+import re
+from datetime import date, timedelta
+
+# Open-ended questions always go to the LLM, even if they mention tasks or hours
+ADVICE_PATTERN = re.compile(
+    r"\b(should|could|would|recommend|suggest|advice|tips?|help me|plan|schedule|"
+    r"how (do|can) i|how to|what happens|what if|is it (ok|okay|fine|bad|normal)|why|explain|better|best)\b"
+)
+
+PENDING_COUNT_PATTERN = re.compile(
+    r"\bhow many\b.*\b(pending|open|remaining|unfinished|incomplete|outstanding)\b.*\b(tasks?|assignments?)\b"
+    r"|\bhow many\b.*\b(tasks?|assignments?)\b.*\b(pending|left|remaining|to do|open)\b"
+)
+COMPLETED_COUNT_PATTERN = re.compile(
+    r"\bhow many\b.*\b(tasks?|assignments?)\b.*\b(completed|done|finished)\b"
+    r"|\bhow many\b.*\b(completed|finished)\b.*\b(tasks?|assignments?)\b"
+)
+OVERDUE_PATTERN = re.compile(r"\boverdue\b|\b(late|missed)\b.*\b(tasks?|assignments?|deadlines?)\b")
+DUE_PATTERN = re.compile(
+    r"\b(due|deadlines?)\b.*\b(today|tomorrow|this week|next week)\b"
+    r"|\b(today|tomorrow|this week|next week)\b.*\b(due|deadlines?)\b"
+)
+HOURS_PATTERN = re.compile(r"\bhow (many|much)\b.*\b(hours?|time)\b.*\bstud(y|ied|ying)\b")
+SUBJECTS_PATTERN = re.compile(r"\b(what|which|list|show)\b.*\bsubjects\b")
+
+# Periods answer_hours can turn into a date range
+PERIOD_PATTERN = re.compile(
+    r"\b(today|yesterday|(this|last|past) (week|month|year)|(last|past) (\d+) days)\b"
+)
+# Any other time qualifier is left to the LLM rather than answered as all-time
+OTHER_TIME_PATTERN = re.compile(
+    r"\b(since|before|after|between|until|ago|during|weekend|semester|term|tonight|morning|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"january|february|march|april|may|june|july|august|september|october|november|december|"
+    r"\d{4}-\d{2}-\d{2}|\d{4})\b"
+)
+# Words an hours question may contain besides a subject and a period
+HOURS_FILLER = frozenset("""
+how many much hours hour time study studied studying did do have i i've ive me my for in on of
+the a so far total overall altogether all spend spent been
+""".split())
+
+# Words an overdue or due-date question may contain besides its keywords.
+# Anything else ("how to catch up on missed deadlines") goes to the LLM.
+TASK_LIST_FILLER = frozenset("""
+what what's whats which is are was were do i have any anything my me show list tell give the
+all there how many tasks task assignments assignment deadlines deadline homework
+overdue late missed due today tomorrow this next week coming up upcoming
+""".split())
+
+MAX_LISTED_TASKS = 10
+
+
+class IntentRouter:
+    # Answers questions the database can answer directly, so they skip the LLM
+    def __init__(self, db_managers):
+        self.db = db_managers
+
+    def route(self, message):
+        # Templated answer for a recognised data question, otherwise None
+        text = message.lower().strip()
+        if not text or ADVICE_PATTERN.search(text):
+            return None
+
+        if OVERDUE_PATTERN.search(text):
+            return self.answer_overdue(text)
+        if DUE_PATTERN.search(text):
+            return self.answer_due(text)
+        if PENDING_COUNT_PATTERN.search(text):
+            return self.answer_task_count(completed=False)
+        if COMPLETED_COUNT_PATTERN.search(text):
+            return self.answer_task_count(completed=True)
+        if HOURS_PATTERN.search(text):
+            return self.answer_hours(text)
+        if SUBJECTS_PATTERN.search(text):
+            return self.answer_subjects()
+        return None
+
+    def answer_task_count(self, completed):
+        stats = self.db['analytics'].get_task_stats()
+        if completed:
+            return f"You have completed {stats['completed']} task(s)."
+        return f"You have {stats['pending']} pending task(s)."
+
+    def answer_overdue(self, text):
+        if not self._only_words(text, TASK_LIST_FILLER):
+            return None
+        tasks = self.db['tasks'].get_overdue()
+        if tasks.empty:
+            return "You have no overdue tasks. 🎉"
+        return f"You have {len(tasks)} overdue task(s):\n" + self._format_tasks(tasks)
+
+    def answer_due(self, text):
+        if not self._only_words(text, TASK_LIST_FILLER):
+            return None
+        today = date.today()
+        if "tomorrow" in text:
+            start, end, label = today + timedelta(days=1), today + timedelta(days=1), "tomorrow"
+        elif "next week" in text:
+            start = today + timedelta(days=7 - today.weekday())
+            end, label = start + timedelta(days=6), "next week"
+        elif "this week" in text:
+            start, end, label = today, today + timedelta(days=6), "in the next 7 days"
+        else:
+            start, end, label = today, today, "today"
+
+        tasks = self.db['tasks'].get_due_between(start, end)
+        if tasks.empty:
+            return f"Nothing is due {label}."
+        return f"{len(tasks)} task(s) due {label}:\n" + self._format_tasks(tasks)
+
+    def answer_hours(self, text):
+        # Hours for a subject and/or period; None if part of the question isn't understood
+        if OTHER_TIME_PATTERN.search(text):
+            return None
+
+        # The whole message is checked: a subject can come before "how many"
+        period = self._parse_period(text)
+        question = text
+        if period:
+            start, end, label, phrase = period
+            question = question.replace(phrase, " ")
+        else:
+            start, end, label = None, None, "in total"
+
+        hours_by_subject = self.db['analytics'].get_hours_by_subject(start, end)
+        subject = None
+        for _, row in hours_by_subject.iterrows():
+            name = str(row['name']).lower()
+            if re.search(rf"\b{re.escape(name)}\b", question):
+                subject = row
+                question = re.sub(rf"\b{re.escape(name)}\b", " ", question)
+                break
+
+        # Leftover words (an unknown subject, "and physics", ...) mean we can't answer exactly
+        if not self._only_words(question, HOURS_FILLER):
+            return None
+
+        if subject is not None:
+            return f"You studied {subject['name']} for {subject['hours']:.1f} hour(s) {label}."
+        if period:
+            total = float(hours_by_subject['hours'].sum())
+        else:
+            total = self.db['analytics'].get_total_study_hours()
+        return f"You studied for {total:.1f} hour(s) {label}."
+
+    def _only_words(self, text, allowed):
+        # Whether every word in text is one of the allowed words
+        return all(word in allowed for word in re.findall(r"[a-z0-9']+", text))
+
+    def _parse_period(self, text):
+        # (start, end, label, matched phrase) for a past period, or None
+        match = PERIOD_PATTERN.search(text)
+        if not match:
+            return None
+        phrase = match.group(0)
+        today = date.today()
+
+        if phrase == "today":
+            return today, today, "today", phrase
+        if phrase == "yesterday":
+            yesterday = today - timedelta(days=1)
+            return yesterday, yesterday, "yesterday", phrase
+        if match.group(5):
+            days = int(match.group(5))
+            return today - timedelta(days=days - 1), today, f"in the past {days} days", phrase
+
+        which, unit = match.group(2), match.group(3)
+        if unit == "week":
+            monday = today - timedelta(days=today.weekday())
+            if which == "this":
+                return monday, today, "this week", phrase
+            if which == "last":
+                return monday - timedelta(days=7), monday - timedelta(days=1), "last week", phrase
+            return today - timedelta(days=6), today, "in the past 7 days", phrase
+        if unit == "month":
+            first = today.replace(day=1)
+            if which == "this":
+                return first, today, "this month", phrase
+            if which == "last":
+                last_end = first - timedelta(days=1)
+                return last_end.replace(day=1), last_end, "last month", phrase
+            return today - timedelta(days=29), today, "in the past 30 days", phrase
+        first = today.replace(month=1, day=1)
+        if which == "this":
+            return first, today, "this year", phrase
+        if which == "last":
+            return first.replace(year=today.year - 1), first - timedelta(days=1), "last year", phrase
+        return today - timedelta(days=364), today, "in the past 365 days", phrase
+
+    def answer_subjects(self):
+        subjects = self.db['subjects'].read()
+        if subjects.empty:
+            return "You haven't added any subjects yet."
+        return f"Your subjects: {', '.join(subjects['name'].tolist())}."
+
+    def _format_tasks(self, tasks):
+        lines = [
+            f"- {task['title']} ({task['subject_name'] or 'No subject'}), due {task['due_date']}"
+            for _, task in tasks.head(MAX_LISTED_TASKS).iterrows()
+        ]
+        if len(tasks) > MAX_LISTED_TASKS:
+            lines.append(f"- ...and {len(tasks) - MAX_LISTED_TASKS} more")
+        return "\n".join(lines)
@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGenerativeModel:
+    # Stands in for genai.GenerativeModel so chat flows never hit the network
+    latency = 0.0
+
+    def __init__(self, model_name, *args, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        return StubResponse("Stub answer: break the work into short focused sessions.")
+
+
+def seed_database(db_path, subjects=10, tasks=200, logs=2000):
+    # Fill a database with random subjects, tasks and study sessions
+    from database import get_db_managers
+
+    db_mgr = get_db_managers(db_path)
+    conn = db_mgr['db'].get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO subjects (name, difficulty, hours, priority) VALUES (?, ?, ?, ?)",
+        [(f"Seed Subject {i}", random.randint(1, 10), 3.0, random.randint(1, 5)) for i in range(subjects)]
+    )
+    subject_ids = [row[0] for row in cursor.execute("SELECT id FROM subjects")]
+    today = date.today()
+    cursor.executemany(
+        """INSERT INTO tasks (subject_id, title, description, due_date, estimated_hours, completed)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        [
+            (random.choice(subject_ids), f"Seed Task {i}", "",
+             (today + timedelta(days=random.randint(-30, 30))).isoformat(), 2.0, int(random.random() < 0.5))
+            for i in range(tasks)
+        ]
+    )
+    cursor.executemany(
+        "INSERT INTO study_logs (subject_id, date, hours_studied, notes) VALUES (?, ?, ?, ?)",
+        [
+            (random.choice(subject_ids), (today - timedelta(days=random.randint(0, 365))).isoformat(),
+             random.choice([0.5, 1.0, 1.5, 2.0]), "seeded session")
+            for _ in range(logs)
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+
+def _by_label(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+class SessionRecorder:
+    # Latency and error bookkeeping, merged across worker processes
+    def __init__(self):
+        self.latencies = {}
+        self.lock_errors = 0
+        self.errors = []
+
+    def record(self, page, seconds, exceptions):
+        self.latencies.setdefault(page, []).append(seconds)
+        for exception in exceptions:
+            if "database is locked" in exception or "database is busy" in exception:
+                self.lock_errors += 1
+            else:
+                self.errors.append(f"{page}: {exception}")
+
+    def merge(self, other):
+        for page, samples in other.latencies.items():
+            self.latencies.setdefault(page, []).extend(samples)
+        self.lock_errors += other.lock_errors
+        self.errors.extend(other.errors)
+
+    def summary(self):
+        pages = {}
+        for page, samples in self.latencies.items():
+            values = np.array(samples) * 1000
+            pages[page] = {
+                'runs': len(samples),
+                'p50_ms': float(np.percentile(values, 50)),
+                'p95_ms': float(np.percentile(values, 95)),
+                'p99_ms': float(np.percentile(values, 99)),
+                'max_ms': float(values.max())
+            }
+        return {'pages': pages, 'lock_errors': self.lock_errors, 'errors': self.errors}
+
+
+def _init_worker(db_path, llm_latency):
+    # AppTest swaps a process-wide Runtime singleton in and out on every run,
+    # so concurrent sessions each get their own process rather than a thread
+    import google.generativeai as genai
+
+    os.environ["STUDY_PLANNER_DB"] = db_path
+    StubGenerativeModel.latency = llm_latency
+    genai.GenerativeModel = StubGenerativeModel
+
+
+def run_session(session_id, tasks_per_session=3, timeout=60):
+    # One simulated user working through every page
+    from streamlit.testing.v1 import AppTest
+
+    recorder = SessionRecorder()
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=timeout)
+    subject_name = f"Load Subject {session_id}"
+
+    def step(page, action):
+        started = time.perf_counter()
+        try:
+            action()
+            exceptions = [e.message for e in at.exception]
+        except Exception as e:
+            exceptions = [str(e)]
+        recorder.record(page, time.perf_counter() - started, exceptions)
+
+    def navigate(page):
+        step(page, lambda: at.sidebar.radio[0].set_value(page).run())
+
+    step("🏠 Home", at.run)
+    step("⚙️ Settings", lambda: at.sidebar.text_input[0].set_value("stub-key").run())
+
+    navigate("📚 Subjects")
+    _by_label(at.text_input, "Subject Name").set_value(subject_name)
+    step("📚 Subjects", lambda: _by_label(at.button, "Add Subject").click().run())
+
+    navigate("📝 Tasks")
+    for i in range(tasks_per_session):
+        _by_label(at.selectbox, "Subject").set_value(subject_name)
+        _by_label(at.text_input, "Task Title").set_value(f"Load Task {session_id}-{i}")
+        _by_label(at.date_input, "Due Date").set_value(date.today() + timedelta(days=i))
+        step("📝 Tasks", lambda: _by_label(at.button, "Add Task").click().run())
+
+    for _ in range(tasks_per_session):
+        complete_buttons = [b for b in at.button if b.key and b.key.startswith("complete_")]
+        if not complete_buttons:
+            break
+        step("📝 Tasks", lambda: random.choice(complete_buttons).click().run())
+
+    navigate("📊 Analytics")
+    _by_label(at.selectbox, "Subject").set_value(subject_name)
+    _by_label(at.date_input, "Date").set_value(date.today())
+    _by_label(at.number_input, "Hours Studied").set_value(1.5)
+    _by_label(at.text_area, "Notes (optional)").set_value(f"load test session {session_id}")
+    step("📊 Analytics", lambda: _by_label(at.button, "Log Session").click().run())
+
+    navigate("💬 Chat Assistant")
+    for message in ("How many pending tasks do I have?", "Give me tips for my exam revision"):
+        step("💬 Chat Assistant", lambda: at.chat_input[0].set_value(message).run())
+
+    return recorder
+
+
+def run_load_test(db_path, sessions, concurrency, tasks_per_session=3, llm_latency=0.0):
+    # Run the sessions against db_path and return the latency/error summary
+    recorder = SessionRecorder()
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=concurrency, initializer=_init_worker, initargs=(db_path, llm_latency)
+    ) as executor:
+        futures = [
+            executor.submit(run_session, i, tasks_per_session)
+            for i in range(sessions)
+        ]
+        for future in futures:
+            try:
+                recorder.merge(future.result())
+            except Exception as e:
+                recorder.record("session", 0.0, [str(e)])
+
+    summary = recorder.summary()
+    summary['sessions'] = sessions
+    summary['concurrency'] = concurrency
+    summary['elapsed_s'] = time.perf_counter() - started
+    return summary
+
+
+def print_summary(summary):
+    print(f"{summary['sessions']} sessions, {summary['concurrency']} concurrent, "
+          f"{summary['elapsed_s']:.1f}s total")
+    print(f"{'Page':<22}{'runs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for page, stats in sorted(summary['pages'].items()):
+        print(f"{page:<22}{stats['runs']:>6}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+              f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    print(f"SQLite lock errors: {summary['lock_errors']}")
+    print(f"Other errors: {len(summary['errors'])}")
+    for error in summary['errors'][:10]:
+        print(f"  {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent Study Planner sessions")
+    parser.add_argument("-n", "--sessions", type=int, default=20, help="Sessions to simulate")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Sessions running at once, one process each")
+    parser.add_argument("--tasks", type=int, default=3, help="Tasks each session adds and completes")
+    parser.add_argument("--db", help="Database to test against (default: a freshly seeded temp file)")
+    parser.add_argument("--seed-subjects", type=int, default=10)
+    parser.add_argument("--seed-tasks", type=int, default=200)
+    parser.add_argument("--seed-logs", type=int, default=2000)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the stub Gemini sleeps per call")
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    db_path = args.db
+    if not db_path:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="study_planner_load_"), "load.db")
+        seed_database(db_path, args.seed_subjects, args.seed_tasks, args.seed_logs)
+        print(f"Seeded {db_path}")
+
+    summary = run_load_test(db_path, args.sessions, args.concurrency, args.tasks, args.llm_latency)
+    print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == "__main__":
+    # AppTest rebinds __main__ to main.py inside workers, so anything sent
+    # across the pool has to live in the importable loadtest module
+    from loadtest import main
+    sys.exit(main())
@@ -1,9 +1,11 @@
+import os
 import streamlit as st
 import google.generativeai as genai
 from datetime import date
-import pandas as pd
-import plotly.express as px
+import plotly.io as pio
+from charts import build_analytics_figures
 from database import get_db_managers
+from intent_router import IntentRouter
 
 # Page config
 st.set_page_config(
@@ -194,9 +196,13 @@ footer {
 
 # Initialize database managers
 if 'db_managers' not in st.session_state:
-    st.session_state.db_managers = get_db_managers()
+    st.session_state.db_managers = get_db_managers(
+        os.environ.get("STUDY_PLANNER_DB", "study_planner.db"),
+        columnar=os.environ.get("STUDY_PLANNER_COLUMNAR") == "1"
+    )
 
 db_mgr = st.session_state.db_managers
+intent_router = IntentRouter(db_mgr)
 
 # Initialize chat history
 if 'chat_history' not in st.session_state:
@@ -230,12 +236,48 @@ with st.sidebar:
     st.markdown("### 📍 Navigation")
     page = st.radio(
         "Go to:",
-        ["🏠 Home", "💬 Chat Assistant", "📚 Subjects", "📝 Tasks", "📊 Analytics"],
+        ["🏠 Home", "💬 Chat Assistant", "📚 Subjects", "📝 Tasks", "📅 Agenda", "📊 Analytics"],
         label_visibility="collapsed"
     )
 
+    st.markdown("---")
+    with st.expander("🧹 Maintenance"):
+        retention = db_mgr['retention']
+        retention.chat_days = st.number_input("Archive chats older than (days)", min_value=1, value=retention.chat_days)
+        retention.task_days = st.number_input("Archive completed tasks after (days)", min_value=1, value=retention.task_days)
+
+        if st.button("Run Maintenance", use_container_width=True):
+            with st.spinner("Archiving old data..."):
+                result = retention.run(max_vacuum_steps=50)
+            if result['incremental']:
+                st.success(
+                    f"✓ Archived {result['chat_archived']} chats and {result['tasks_archived']} tasks, "
+                    f"freed {result['pages_freed']} pages"
+                )
+            else:
+                st.success(f"✓ Archived {result['chat_archived']} chats and {result['tasks_archived']} tasks")
+
+        if not retention.is_incremental():
+            st.warning("⚠ This database file can't shrink until it is converted to incremental vacuum.")
+            st.caption("One-off full VACUUM: rewrites the whole file and blocks other sessions while it runs.")
+            if st.button("Convert to Incremental Vacuum", use_container_width=True):
+                with st.spinner("Rewriting database file..."):
+                    retention.enable_incremental_vacuum()
+                st.success("✓ Converted, future maintenance runs will shrink the file")
+                st.rerun()
+
+# Cached chart JSON, keyed on database file, epoch and data version
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_analytics_figures(_analytics, db_name, epoch, data_version):
+    return build_analytics_figures(_analytics)
+
 # AI Chat function
 def chat_with_ai(message):
+    # Data questions are answered locally, without an API call
+    local_answer = intent_router.route(message)
+    if local_answer is not None:
+        return local_answer
+
     if not st.session_state.gemini_api_key:
         return "Please configure your Gemini API key in the sidebar."
 
@@ -247,10 +289,17 @@ def chat_with_ai(message):
         tasks_df = db_mgr['tasks'].read()
         pending_count = len(db_mgr['tasks'].get_by_status(completed=False))
 
+        # Relevant study notes and earlier answers
+        snippets = db_mgr['retrieval'].search(message, k=5)
+        memory = "\n".join(f"- {s['text']}" for s in snippets) if snippets else "None"
+
         context = f"""You are a helpful study planning assistant.
 Current subjects: {subjects_df["name"].tolist() if not subjects_df.empty else "None"}
 Pending tasks: {pending_count}
 
+Relevant notes and past conversations:
+{memory}
+
 User question: {message}
 
 Provide helpful, concise advice about studying, time management, or task prioritization."""
@@ -312,6 +361,18 @@ elif page == "💬 Chat Assistant":
         st.warning("⚠ Please enter your Gemini API key in the sidebar to use the chat assistant.")
         st.info("Get your free API key at https://aistudio.google.com/app/apikey")
 
+    with st.expander("🗄️ Archived Conversations"):
+        if st.checkbox("Load archived conversations"):
+            archived_chats = db_mgr['chat'].read_archive(limit=200)
+
+            if not archived_chats.empty:
+                for _, chat in archived_chats.iterrows():
+                    st.markdown(f"**You ({chat['timestamp']}):** {chat['message']}")
+                    st.markdown(chat['response'])
+                    st.markdown("---")
+            else:
+                st.info("No archived conversations!")
+
     # Chat container
     chat_container = st.container()
 
@@ -429,7 +490,7 @@ elif page == "📝 Tasks":
 
         # Display tasks in tabs
         st.markdown("### Your Tasks")
-        tab1, tab2 = st.tabs(["⏳ Pending", "✅ Completed"])
+        tab1, tab2, tab3 = st.tabs(["⏳ Pending", "✅ Completed", "🗄️ Archived"])
 
         with tab1:
             pending_tasks = db_mgr['tasks'].get_by_status(completed=False)
@@ -478,6 +539,74 @@ elif page == "📝 Tasks":
             else:
                 st.info("No completed tasks yet!")
 
+        with tab3:
+            # Archive is only queried when asked for
+            if st.checkbox("Show archived tasks"):
+                archived_tasks = db_mgr['tasks'].read_archived()
+
+                if not archived_tasks.empty:
+                    st.dataframe(
+                        archived_tasks[['title', 'subject_name', 'due_date', 'completed_at', 'archived_at']],
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                else:
+                    st.info("No archived tasks!")
+
+elif page == "📅 Agenda":
+    st.markdown('<h1 class="main-header">📅 Upcoming Deadlines</h1>', unsafe_allow_html=True)
+
+    horizon = st.slider("Days ahead", 1, 30, 7)
+    agenda = db_mgr['tasks'].get_agenda(days=horizon)
+
+    # Overdue tasks first
+    st.markdown("### ⚠️ Overdue")
+    if not agenda['overdue'].empty:
+        for _, task in agenda['overdue'].iterrows():
+            with st.container():
+                col1, col2, col3 = st.columns([4, 2, 1])
+
+                with col1:
+                    st.markdown(f"**{task['title']}**")
+                    st.caption(f"Subject: {task['subject_name']}")
+
+                with col2:
+                    st.caption(f"📅 Was due: {task['due_date']}")
+                    st.caption(f"⏱️ Est: {task['estimated_hours']}h")
+
+                with col3:
+                    if st.button("✓", key=f"agenda_complete_{task['id']}"):
+                        db_mgr['tasks'].mark_complete(task['id'])
+                        st.rerun()
+
+                st.markdown("---")
+    else:
+        st.info("Nothing overdue!")
+
+    # Upcoming tasks, grouped by due date
+    st.markdown(f"### 🗓️ Next {horizon} Days")
+    if not agenda['upcoming'].empty:
+        for due_date, tasks in agenda['upcoming'].groupby('due_date', sort=True):
+            st.markdown(f"**{date.fromisoformat(due_date).strftime('%A, %d %B')}**")
+            for _, task in tasks.iterrows():
+                col1, col2, col3 = st.columns([4, 2, 1])
+
+                with col1:
+                    st.markdown(f"{task['title']}")
+                    st.caption(f"Subject: {task['subject_name']}")
+
+                with col2:
+                    st.caption(f"⏱️ Est: {task['estimated_hours']}h")
+
+                with col3:
+                    if st.button("✓", key=f"agenda_complete_{task['id']}"):
+                        db_mgr['tasks'].mark_complete(task['id'])
+                        st.rerun()
+
+            st.markdown("---")
+    else:
+        st.info(f"Nothing due in the next {horizon} days!")
+
 elif page == "📊 Analytics":
     st.markdown('<h1 class="main-header">📊 Study Analytics & Insights</h1>', unsafe_allow_html=True)
 
@@ -503,38 +632,22 @@ elif page == "📊 Analytics":
 
     st.markdown("---")
 
-    # Charts
-    hours_by_subject = db_mgr['analytics'].get_hours_by_subject()
+    # Charts, rebuilt only when the data version or epoch changes
+    meta = db_mgr['db'].get_meta()
+    figures = get_analytics_figures(
+        db_mgr['analytics'], db_mgr['db'].db_name, meta.get('epoch'), meta['data_version']
+    )
 
-    if not hours_by_subject.empty and hours_by_subject['hours'].sum() > 0:
+    if figures['hours_by_subject']:
         st.markdown("### 📊 Study Hours by Subject")
-        fig = px.bar(
-            hours_by_subject, 
-            x="name", 
-            y="hours", 
-            title="Total Study Hours per Subject",
-            labels={"name": "Subject", "hours": "Hours"}, 
-            color="hours", 
-            color_continuous_scale="Greys"
-        )
-        fig.update_layout(plot_bgcolor="white", paper_bgcolor="white", font=dict(color="#2c3e50"))
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(pio.from_json(figures['hours_by_subject']), use_container_width=True)
+
+    if figures['daily_hours']:
+        st.markdown("### 📅 Study Hours Over Time")
+        st.plotly_chart(pio.from_json(figures['daily_hours']), use_container_width=True)
 
     st.markdown("### 📈 Task Completion Status")
-    completion_data = pd.DataFrame({
-        "Status": ["Completed", "Pending"], 
-        "Count": [task_stats["completed"], task_stats["pending"]]
-    })
-
-    fig2 = px.pie(
-        completion_data, 
-        values="Count", 
-        names="Status", 
-        title="Task Distribution",
-        color_discrete_sequence=["#7f8c8d", "#bdc3c7"]
-    )
-    fig2.update_layout(paper_bgcolor="white", font=dict(color="#2c3e50"))
-    st.plotly_chart(fig2, use_container_width=True)
+    st.plotly_chart(pio.from_json(figures['task_completion']), use_container_width=True)
 
     st.markdown("---")
 
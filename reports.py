@@ -0,0 +1,217 @@
+import argparse
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from database import get_db_managers
+
+
+def build_weekly_report(db_path, week_end, columnar=False, migrate=False):
+    # Weekly progress summary for one database file. Opened read-only unless
+    # migrate is set, so the nightly run never changes student databases.
+    db_mgr = get_db_managers(db_path, columnar=columnar, read_only=not migrate)
+    week_start = week_end - timedelta(days=6)
+
+    hours_by_subject = db_mgr['analytics'].get_hours_by_subject(week_start, week_end)
+    due_this_week = db_mgr['tasks'].get_due_between(week_start, week_end, completed=False)
+    done_this_week = db_mgr['tasks'].get_due_between(week_start, week_end, completed=True)
+    overdue = db_mgr['tasks'].get_overdue(as_of=week_end)
+    task_stats = db_mgr['analytics'].get_task_stats()
+
+    completed = int(task_stats['completed'])
+    pending = int(task_stats['pending'])
+    due_total = len(due_this_week) + len(done_this_week)
+
+    return {
+        'database': os.path.abspath(db_path),
+        'week_start': week_start.isoformat(),
+        'week_end': week_end.isoformat(),
+        'total_hours': float(hours_by_subject['hours'].sum()),
+        'hours_by_subject': [
+            {'subject': row['name'], 'hours': float(row['hours'])}
+            for _, row in hours_by_subject.iterrows()
+        ],
+        'tasks_completed': completed,
+        'tasks_pending': pending,
+        'completion_rate': completed / (completed + pending) if completed + pending else None,
+        'weekly_completion_rate': len(done_this_week) / due_total if due_total else None,
+        'overdue_tasks': [
+            {
+                'title': task['title'],
+                'subject': task['subject_name'],
+                'due_date': task['due_date']
+            }
+            for _, task in overdue.iterrows()
+        ]
+    }
+
+
+def _format_rate(rate):
+    return "n/a" if rate is None else f"{rate:.0%}"
+
+
+def render_html(report):
+    subject_rows = "".join(
+        f"<tr><td>{html.escape(str(row['subject']))}</td><td>{row['hours']:.1f}</td></tr>"
+        for row in report['hours_by_subject']
+    ) or '<tr><td colspan="2">No subjects</td></tr>'
+    overdue_rows = "".join(
+        f"<tr><td>{html.escape(str(task['title']))}</td>"
+        f"<td>{html.escape(str(task['subject']))}</td>"
+        f"<td>{html.escape(str(task['due_date']))}</td></tr>"
+        for task in report['overdue_tasks']
+    ) or '<tr><td colspan="3">No overdue tasks</td></tr>'
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Weekly Study Report {report['week_start']} to {report['week_end']}</title>
+<style>
+body {{ font-family: sans-serif; color: #2c3e50; max-width: 800px; margin: 2rem auto; }}
+table {{ border-collapse: collapse; width: 100%; margin-bottom: 1.5rem; }}
+th, td {{ border: 1px solid #dee2e6; padding: 0.4rem 0.6rem; text-align: left; }}
+th {{ background-color: #f8f9fa; }}
+</style>
+</head>
+<body>
+<h1>📚 Weekly Study Report</h1>
+<p>{report['week_start']} to {report['week_end']}</p>
+<h2>📈 Summary</h2>
+<table>
+<tr><th>Study hours this week</th><td>{report['total_hours']:.1f}h</td></tr>
+<tr><th>Completed tasks</th><td>{report['tasks_completed']}</td></tr>
+<tr><th>Pending tasks</th><td>{report['tasks_pending']}</td></tr>
+<tr><th>Overall completion rate</th><td>{_format_rate(report['completion_rate'])}</td></tr>
+<tr><th>Tasks due this week completed</th><td>{_format_rate(report['weekly_completion_rate'])}</td></tr>
+</table>
+<h2>📊 Hours by Subject</h2>
+<table>
+<tr><th>Subject</th><th>Hours</th></tr>
+{subject_rows}
+</table>
+<h2>⚠️ Overdue Tasks</h2>
+<table>
+<tr><th>Task</th><th>Subject</th><th>Due</th></tr>
+{overdue_rows}
+</table>
+</body>
+</html>
+"""
+
+
+def report_path(db_path, base_dir, out_dir, week_end, fmt):
+    # Mirror the databases' directory layout under out_dir, so per-user files
+    # that share a name (users/alice/study_planner.db, users/bob/...) stay apart
+    rel_dir = os.path.relpath(os.path.dirname(os.path.abspath(db_path)), base_dir)
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    return os.path.normpath(os.path.join(out_dir, rel_dir, f"{name}-{week_end.isoformat()}.{fmt}"))
+
+
+def write_report(db_path, out_path, week_end, fmt, columnar=False, overwrite=False, migrate=False):
+    # Worker entry point: build one report and write it straight to disk
+    report = build_weekly_report(db_path, week_end, columnar, migrate)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    # "x" refuses to clobber an existing report unless asked to
+    with open(out_path, "w" if overwrite else "x", encoding="utf-8") as f:
+        if fmt == "html":
+            f.write(render_html(report))
+        else:
+            json.dump(report, f, indent=2)
+    return out_path
+
+
+def find_databases(paths):
+    # Expand directories into the .db files they contain
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith(".db")
+            )
+        elif os.path.isfile(path):
+            found.append(path)
+        else:
+            print(f"Skipping missing path: {path}", file=sys.stderr)
+
+    # Each file once, even if listed twice
+    unique = {}
+    for path in found:
+        unique.setdefault(os.path.abspath(path), path)
+    return list(unique.values())
+
+
+def generate_reports(db_paths, out_dir, fmt="json", week_end=None, workers=None,
+                     columnar=False, overwrite=False, migrate=False):
+    # Fan out over a process pool, yielding (db_path, out_path, error) as each finishes
+    week_end = week_end or date.today()
+    os.makedirs(out_dir, exist_ok=True)
+    if not db_paths:
+        return
+    base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in db_paths])
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                write_report, db_path, report_path(db_path, base_dir, out_dir, week_end, fmt),
+                week_end, fmt, columnar, overwrite, migrate
+            ): db_path
+            for db_path in db_paths
+        }
+        for future in as_completed(futures):
+            db_path = futures[future]
+            try:
+                yield db_path, future.result(), None
+            except Exception as e:
+                yield db_path, None, str(e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate weekly study reports for many databases")
+    parser.add_argument("paths", nargs="+", help="Database files or directories of .db files")
+    parser.add_argument("-o", "--out", default="reports", help="Output directory (default: reports)")
+    parser.add_argument("-f", "--format", choices=["json", "html"], default="json")
+    parser.add_argument("--week-end", type=date.fromisoformat, default=None,
+                        help="Last day of the reported week, YYYY-MM-DD (default: today)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Worker processes (default: number of CPUs)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Aggregate through the DuckDB mirror (requires duckdb)")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Replace reports that already exist instead of failing")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Open databases read-write and upgrade older schemas (default: read-only)")
+    args = parser.parse_args(argv)
+
+    db_paths = find_databases(args.paths)
+    started = time.perf_counter()
+    failed = 0
+
+    # One line per database, appended as each report lands
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "index.jsonl"), "a", encoding="utf-8") as index:
+        for db_path, out_path, error in generate_reports(
+            db_paths, args.out, args.format, args.week_end, args.workers,
+            args.columnar, args.overwrite, args.migrate
+        ):
+            index.write(json.dumps({'database': db_path, 'report': out_path, 'error': error}) + "\n")
+            index.flush()
+            if error:
+                failed += 1
+                print(f"✗ {db_path}: {error}", file=sys.stderr)
+            else:
+                print(f"✓ {db_path} -> {out_path}")
+
+    elapsed = time.perf_counter() - started
+    print(f"{len(db_paths) - failed}/{len(db_paths)} reports written in {elapsed:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
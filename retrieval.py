@@ -0,0 +1,338 @@
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import warnings
+import zipfile
+from array import array
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a about after all also am an and any are as at be because been before being but by can
+could did do does doing for from had has have having he her here him his how i if in into
+is it its just me more most my no not now of on once only or other our out over own same
+she should so some such than that the their them then there these they this those through
+to too under until up very was we were what when where which while who whom why will with
+would you your
+""".split())
+
+SNIPPET_LENGTH = 300
+# New documents to collect before rewriting the index file. Anything not yet
+# saved is re-read from the database on the next load via the watermarks.
+SAVE_EVERY = 200
+
+
+_shared_indexes = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_index(db_manager):
+    # One index per database file per process, shared by every session
+    key = os.path.abspath(db_manager.db_name)
+    with _shared_lock:
+        if key not in _shared_indexes:
+            _shared_indexes[key] = RetrievalIndex(db_manager)
+        return _shared_indexes[key]
+
+
+def _pack_strings(strings):
+    # UTF-8 bytes of all strings plus their start offsets, for np.savez
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(data) for data in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(data, offsets):
+    raw = data.tobytes()
+    offsets = offsets.tolist()
+    return [raw[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+def tokenize(text):
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class RetrievalIndex:
+    # TF-IDF index over study log notes and chat history, kept as an inverted
+    # index of growable arrays so new rows are appended without a rebuild.
+    # Persisted next to the database file and topped up on every search.
+    # Loading, rebuilding and saving run on a background thread so a chat
+    # reply never waits on more than the rows written since the last search.
+    def __init__(self, db_manager, path=None):
+        self.db = db_manager
+        self.path = path or f"{db_manager.db_name}.tfidf"
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.unsaved = 0
+        self.worker = None
+        self._reset()
+
+    def _reset(self):
+        self.vocab = {}
+        self.postings_docs = []
+        self.postings_tf = []
+        self.doc_sources = []
+        self.doc_snippets = []
+        self.doc_norms = array('f')
+        self.watermarks = {'study_logs': 0, 'chat_history': 0}
+        self.epoch = None
+
+    def load(self):
+        # Read the persisted index, if there is one. Arrays and JSON only,
+        # so a tampered file can't run code when the database is opened.
+        if os.path.exists(self.path):
+            try:
+                with np.load(self.path) as data:
+                    arrays = {name: data[name] for name in data.files}
+                meta = json.loads(arrays['meta'].tobytes().decode('utf-8'))
+                offsets = arrays['offsets'].tolist()
+                docs = arrays['postings_docs'].tobytes()
+                tfs = arrays['postings_tf'].tobytes()
+                self.vocab = {
+                    token: term_id
+                    for term_id, token in enumerate(_unpack_strings(arrays['vocab'], arrays['vocab_offsets']))
+                }
+                self.postings_docs = [array('i', docs[4 * offsets[i]:4 * offsets[i + 1]]) for i in range(len(offsets) - 1)]
+                self.postings_tf = [array('f', tfs[4 * offsets[i]:4 * offsets[i + 1]]) for i in range(len(offsets) - 1)]
+                self.doc_sources = list(zip(
+                    _unpack_strings(arrays['doc_kinds'], arrays['doc_kind_offsets']),
+                    arrays['doc_ids'].tolist()
+                ))
+                self.doc_snippets = _unpack_strings(arrays['doc_snippets'], arrays['doc_snippet_offsets'])
+                self.doc_norms = array('f', arrays['doc_norms'].tobytes())
+                self.watermarks = meta['watermarks']
+                self.epoch = meta['epoch']
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+                self._reset()
+        self.loaded = True
+
+    def _state(self):
+        # Copy of the index, taken under the lock; _write does the slow part
+        return {
+            'vocab': sorted(self.vocab, key=self.vocab.get),
+            'lengths': [len(docs) for docs in self.postings_docs],
+            # bytes.join copies every posting list in one pass over the buffers
+            'postings_docs': b"".join(self.postings_docs),
+            'postings_tf': b"".join(self.postings_tf),
+            'doc_sources': list(self.doc_sources),
+            'doc_snippets': list(self.doc_snippets),
+            'doc_norms': self.doc_norms.tobytes(),
+            'watermarks': dict(self.watermarks),
+            'epoch': self.epoch
+        }
+
+    def _write(self, state):
+        # Write to a temp file first so a crash never leaves a torn index
+        vocab, vocab_offsets = _pack_strings(state['vocab'])
+        kinds, kind_offsets = _pack_strings([source for source, _ in state['doc_sources']])
+        snippets, snippet_offsets = _pack_strings(state['doc_snippets'])
+        meta = json.dumps({'watermarks': state['watermarks'], 'epoch': state['epoch']})
+        arrays = {
+            'vocab': vocab,
+            'vocab_offsets': vocab_offsets,
+            'offsets': np.concatenate(([0], np.cumsum(state['lengths'], dtype=np.int64))),
+            'postings_docs': np.frombuffer(state['postings_docs'], dtype=np.int32),
+            'postings_tf': np.frombuffer(state['postings_tf'], dtype=np.float32),
+            'doc_kinds': kinds,
+            'doc_kind_offsets': kind_offsets,
+            'doc_ids': np.array([row_id for _, row_id in state['doc_sources']], dtype=np.int64),
+            'doc_snippets': snippets,
+            'doc_snippet_offsets': snippet_offsets,
+            'doc_norms': np.frombuffer(state['doc_norms'], dtype=np.float32),
+            'meta': np.frombuffer(meta.encode('utf-8'), dtype=np.uint8)
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile(
+            dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp", delete=False
+        ) as f:
+            tmp_path = f.name
+            try:
+                np.savez(f, **arrays)
+            except Exception:
+                f.close()
+                os.remove(tmp_path)
+                raise
+        os.replace(tmp_path, self.path)
+
+    def save(self):
+        # Write the index now, on the calling thread
+        with self.lock:
+            state = self._state()
+            self.unsaved = 0
+        self._write(state)
+
+    def _worker_busy(self):
+        return self.worker is not None and self.worker.is_alive()
+
+    def _start_worker(self, target):
+        # Run target on a background thread unless one is already running
+        if self._worker_busy():
+            return
+        self.worker = threading.Thread(target=self._run_worker, args=(target,), daemon=True)
+        self.worker.start()
+
+    def _run_worker(self, target):
+        try:
+            target()
+        except Exception as e:
+            warnings.warn(f"Retrieval index update failed: {e}")
+
+    def add(self, source, row_id, text, snippet):
+        # Index one document
+        counts = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        if not counts:
+            return
+
+        doc_id = len(self.doc_sources)
+        norm = 0.0
+        for token, count in counts.items():
+            term_id = self.vocab.get(token)
+            if term_id is None:
+                term_id = len(self.postings_docs)
+                self.vocab[token] = term_id
+                self.postings_docs.append(array('i'))
+                self.postings_tf.append(array('f'))
+            tf = 1.0 + math.log(count)
+            self.postings_docs[term_id].append(doc_id)
+            self.postings_tf[term_id].append(tf)
+            norm += tf * tf
+
+        self.doc_sources.append((source, row_id))
+        self.doc_snippets.append(snippet[:SNIPPET_LENGTH])
+        self.doc_norms.append(math.sqrt(norm))
+
+    def refresh(self):
+        # Index rows written since the last refresh, returns how many were added
+        with self.lock:
+            return self._refresh()
+
+    def _current_epoch(self, cursor):
+        row = cursor.execute("SELECT value FROM db_meta WHERE key = 'epoch'").fetchone()
+        return row[0] if row else None
+
+    def _refresh(self):
+        # An index that isn't loaded yet, or was built before a restore (row
+        # ids start over in a restored snapshot), is caught up in the background
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        if not self.loaded or self._current_epoch(cursor) != self.epoch:
+            conn.close()
+            # Stale documents must not be returned meanwhile
+            self._reset()
+            self._start_worker(self._catch_up)
+            return 0
+
+        added = self._index_new_rows(cursor)
+        conn.close()
+        if self.unsaved >= SAVE_EVERY and not self._worker_busy():
+            state = self._state()
+            self.unsaved = 0
+            self._start_worker(lambda: self._write(state))
+        return added
+
+    def _index_new_rows(self, cursor):
+        cursor.execute(
+            """SELECT sl.id, sl.date, sl.notes, s.name
+               FROM study_logs sl
+               LEFT JOIN subjects s ON sl.subject_id = s.id
+               WHERE sl.id > ? ORDER BY sl.id""",
+            (self.watermarks['study_logs'],)
+        )
+        logs = cursor.fetchall()
+        # Archived exchanges keep their ids, so both tables share one watermark
+        cursor.execute(
+            """SELECT id, message, response FROM chat_history WHERE id > ?
+               UNION ALL
+               SELECT id, message, response FROM chat_history_archive WHERE id > ?
+               ORDER BY id""",
+            (self.watermarks['chat_history'], self.watermarks['chat_history'])
+        )
+        chats = cursor.fetchall()
+
+        before = len(self.doc_sources)
+        for log_id, log_date, notes, subject_name in logs:
+            if notes:
+                self.add('note', log_id, notes, f"[{log_date} · {subject_name or 'No subject'}] {notes}")
+            self.watermarks['study_logs'] = log_id
+        for chat_id, message, response in chats:
+            self.add('chat', chat_id, f"{message} {response}", f"Q: {message} A: {response}")
+            self.watermarks['chat_history'] = chat_id
+
+        self.unsaved += len(logs) + len(chats)
+        return len(self.doc_sources) - before
+
+    def _catch_up(self, rebuild=False):
+        # Load or rebuild into a separate index, then swap it in, so searches
+        # are only blocked for the swap
+        fresh = RetrievalIndex(self.db, self.path)
+        if not rebuild:
+            fresh.load()
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        epoch = self._current_epoch(cursor)
+        if rebuild or fresh.epoch != epoch:
+            fresh._reset()
+            fresh.epoch = epoch
+            fresh.unsaved = SAVE_EVERY
+        fresh._index_new_rows(cursor)
+        conn.close()
+        if fresh.unsaved:
+            fresh._write(fresh._state())
+
+        with self.lock:
+            for name in ('vocab', 'postings_docs', 'postings_tf', 'doc_sources',
+                         'doc_snippets', 'doc_norms', 'watermarks', 'epoch'):
+                setattr(self, name, getattr(fresh, name))
+            self.unsaved = 0
+            self.loaded = True
+
+    def rebuild(self):
+        # Drop the index and re-read everything from the database
+        self._catch_up(rebuild=True)
+
+    def search(self, query, k=5):
+        # Top-k documents for query as dicts with source, id, score and text.
+        # Held under the lock: appends can't resize arrays NumPy is viewing.
+        with self.lock:
+            return self._search(query, k)
+
+    def _search(self, query, k):
+        self._refresh()
+        n_docs = len(self.doc_sources)
+        terms = {t for t in tokenize(query) if t in self.vocab}
+        if n_docs == 0 or not terms:
+            return []
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for token in terms:
+            term_id = self.vocab[token]
+            docs = np.frombuffer(self.postings_docs[term_id], dtype=np.int32)
+            tfs = np.frombuffer(self.postings_tf[term_id], dtype=np.float32)
+            idf = math.log((1 + n_docs) / (1 + len(docs))) + 1.0
+            # A doc appears at most once per posting list, so no np.add.at needed
+            scores[docs] += (idf * idf) * tfs
+
+        scores /= np.maximum(np.frombuffer(self.doc_norms, dtype=np.float32), 1e-6)
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for doc_id in top:
+            source, row_id = self.doc_sources[doc_id]
+            results.append({
+                'source': source,
+                'id': row_id,
+                'score': float(scores[doc_id]),
+                'text': self.doc_snippets[doc_id]
+            })
+        return results